@@ -1,122 +1,99 @@
 import gradio as gr
-import numpy as np
 from PIL import Image
-import io
 import os
 
-# Try to import AI dependencies
-try:
-    from ultralytics import YOLO
-    AI_AVAILABLE = True
+from parking_detector import AI_AVAILABLE, DetectionOptions, get_engine
+
+if AI_AVAILABLE:
     print("✅ AI dependencies loaded successfully")
-except ImportError as e:
-    AI_AVAILABLE = False
-    print(f"⚠️ AI dependencies not available: {e}")
+else:
+    print("⚠️ AI dependencies not available, using simulation")
 
-# Global model variable
-model = None
+# Queue and batching limits (tuned for a small CPU Space)
+CONCURRENCY_LIMIT = int(os.environ.get('GRADIO_CONCURRENCY', 1))
+MAX_BATCH_SIZE = int(os.environ.get('GRADIO_MAX_BATCH', 4))
+MAX_QUEUE_SIZE = int(os.environ.get('GRADIO_QUEUE_SIZE', 32))
 
 def load_model():
     """Load the parking detection model"""
-    global model
-    if model is None and AI_AVAILABLE:
-        try:
-            # Try to load custom model first
-            if os.path.exists('models/parking_model.pt'):
-                print("Loading custom parking model...")
-                model = YOLO('models/parking_model.pt')
-            elif os.path.exists('parking_model.pt'):
-                print("Loading parking model from root...")
-                model = YOLO('parking_model.pt')
-            else:
-                print("Loading pretrained YOLOv8 model...")
-                model = YOLO('yolov8n.pt')  # This will download automatically
-            print("✅ Model loaded successfully!")
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            model = None
-    return model
-
-def detect_parking(image):
-    """Main function for parking detection"""
-    if image is None:
-        return "Please upload an image", None
+    return get_engine().load()
+
+def format_result(result, image):
+    """Turn one DetectionResult into the results text and annotated image"""
+    if result.is_simulation:
+        return simulate_detection(result, image)
     
-    try:
-        # Load model
-        model = load_model()
-        
-        if model is None or not AI_AVAILABLE:
-            # Fallback to simulation
-            return simulate_detection(image)
-        
-        # Run AI detection
-        results = model(image)
-        
-        # Process results
-        detections = []
-        car_count = 0
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    class_name = model.names[class_id]
-                    confidence = float(box.conf[0])
-                    
-                    # Count vehicles
-                    if class_name in ['car', 'truck', 'bus', 'motorcycle']:
-                        car_count += 1
-                    
-                    detections.append({
-                        'class': class_name,
-                        'confidence': confidence
-                    })
-        
-        # Calculate parking info
-        total_spaces = max(15, car_count + np.random.randint(5, 15))
-        empty_spaces = total_spaces - car_count
-        occupancy_rate = (car_count / total_spaces) * 100
-        
-        # Create annotated image
-        annotated_img = results[0].plot()
-        annotated_pil = Image.fromarray(annotated_img)
-        
-        # Create results text
-        result_text = f"""
+    # Annotated image comes back as BGR
+    annotated_pil = Image.fromarray(result.annotated_image[..., ::-1])
+    
+    # Create results text
+    result_text = f"""
 🎯 AI Parking Detection Results:
 
-🚗 Cars Detected: {car_count}
-🅿️ Empty Spaces: {empty_spaces}
-📊 Total Spaces: {total_spaces}
-📈 Occupancy Rate: {occupancy_rate:.1f}%
-🔍 Total Detections: {len(detections)}
+🚗 Cars Detected: {result.car_count}
+🅿️ Empty Spaces: {result.empty_spaces}
+📊 Total Spaces: {result.total_spaces}
+📈 Occupancy Rate: {result.occupancy_rate:.1f}%
+🔍 Total Detections: {len(result.detections)}
 
-Status: {'🟢 Spaces Available' if empty_spaces > 5 else '🟡 Limited Spaces' if empty_spaces > 0 else '🔴 Full'}
+Status: {result.status}
 
 ✅ Real AI Detection Active!
 """
+    
+    return result_text, annotated_pil
+
+def detect_parking_batch(images):
+    """Batched event handler: runs all queued uploads through one model call.
+
+    Gradio cannot report progress for batched events, so this path has none;
+    the button uses detect_parking, which does.
+    """
+    texts = ["Please upload an image"] * len(images)
+    annotated = [None] * len(images)
+    pending = [i for i, image in enumerate(images) if image is not None]
+    if not pending:
+        return texts, annotated
+    
+    try:
+        results = get_engine().detect(
+            [images[i] for i in pending],
+            DetectionOptions(batch_size=MAX_BATCH_SIZE)
+        )
         
-        return result_text, annotated_pil
+        for i, result in zip(pending, results):
+            texts[i], annotated[i] = format_result(result, images[i])
+        
+        return texts, annotated
         
     except Exception as e:
-        return f"❌ Error during detection: {str(e)}", None
+        for i in pending:
+            texts[i], annotated[i] = f"❌ Error during detection: {str(e)}", None
+        return texts, annotated
 
-def simulate_detection(image):
-    """Fallback simulation if AI is not available"""
-    # Simple simulation
-    car_count = np.random.randint(8, 25)
-    total_spaces = car_count + np.random.randint(5, 15)
-    empty_spaces = total_spaces - car_count
+def detect_parking(image, progress=gr.Progress()):
+    """Main function for parking detection (single image, with progress)"""
+    if image is None:
+        return "Please upload an image", None
     
+    try:
+        progress(0, desc="Detecting vehicles...")
+        result = get_engine().detect([image])[0]
+        progress(0.9, desc="Analyzing results...")
+        return format_result(result, image)
+        
+    except Exception as e:
+        return f"❌ Error during detection: {str(e)}", None
+
+def simulate_detection(result, image):
+    """Results text for the fallback simulation when AI is not available"""
     result_text = f"""
 🎯 Simulation Results (AI not available):
 
-🚗 Cars Detected: {car_count}
-🅿️ Empty Spaces: {empty_spaces}
-📊 Total Spaces: {total_spaces}
-📈 Occupancy Rate: {(car_count/total_spaces)*100:.1f}%
+🚗 Cars Detected: {result.car_count}
+🅿️ Empty Spaces: {result.empty_spaces}
+📊 Total Spaces: {result.total_spaces}
+📈 Occupancy Rate: {result.occupancy_rate:.1f}%
 
 ⚠️ This is a simulation - upload your model for real AI detection!
 """
@@ -161,17 +138,28 @@ def create_interface():
                     type="pil"
                 )
         
-        # Event handlers
-        detect_btn.click(
-            fn=detect_parking,
+        # Event handlers share one concurrency slot pool. Uploads are batched,
+        # so a burst of them goes through the model in a few calls
+        upload_event = image_input.change(
+            fn=detect_parking_batch,
             inputs=[image_input],
-            outputs=[result_text, result_image]
+            outputs=[result_text, result_image],
+            batch=True,
+            max_batch_size=MAX_BATCH_SIZE,
+            concurrency_limit=CONCURRENCY_LIMIT,
+            concurrency_id="detect",
+            trigger_mode="always_last"
         )
         
-        image_input.change(
+        # Clicking supersedes a still-queued upload run for the same image;
+        # it runs unbatched so progress can be reported
+        detect_btn.click(
             fn=detect_parking,
             inputs=[image_input],
-            outputs=[result_text, result_image]
+            outputs=[result_text, result_image],
+            concurrency_limit=CONCURRENCY_LIMIT,
+            concurrency_id="detect",
+            cancels=[upload_event]
         )
         
         gr.Markdown("""
@@ -188,11 +176,12 @@ def create_interface():
 if __name__ == "__main__":
     print("🚀 Starting Parking Detection App...")
     
-    # Load model on startup
-    load_model()
+    # Load the model and run a warm-up inference before accepting traffic
+    get_engine().warm_up()
     
-    # Create interface
+    # Create interface with a bounded request queue
     demo = create_interface()
+    demo.queue(max_size=MAX_QUEUE_SIZE, default_concurrency_limit=CONCURRENCY_LIMIT)
     
     # Launch
     demo.launch(
@@ -1,44 +1,39 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 import cv2
-import numpy as np
 import base64
 from PIL import Image
-import io
 import os
 
-# Try to import ultralytics, fallback if not available
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
+from parking_detector import AI_AVAILABLE, DetectionOptions, FeedRegistry, get_engine
+from parking_detector.feed import parse_slots, parse_tracking
+
+if not AI_AVAILABLE:
     print("Warning: ultralytics not available, using mock detection")
-    YOLO_AVAILABLE = False
 
 app = Flask(__name__)
 
-# Load the model (will download YOLOv8 if not present)
-model = None
+# Live occupancy feeds, one per lot. State is per process and every
+# subscriber holds a connection open, so under gunicorn the /lots routes are
+# only served on a single async worker (GUNICORN_LIVE_FEED=1, see
+# gunicorn.conf.py); the development server serves them as-is.
+feeds = FeedRegistry()
+
+def live_feed_unavailable():
+    """Error response if this server cannot run the live feed, else None"""
+    server = request.environ.get('SERVER_SOFTWARE', '')
+    if server.startswith('gunicorn') and os.environ.get('PARKING_LIVE_FEED') != '1':
+        return jsonify({
+            'error': 'Live feed needs a single gevent worker: set GUNICORN_LIVE_FEED=1'
+        }), 503
+    return None
 
 def load_model():
-    global model
-    if model is None and YOLO_AVAILABLE:
-        try:
-            # Try to load custom trained model, fallback to pretrained
-            if os.path.exists('models/parking_model.pt'):
-                print("Loading custom parking model...")
-                model = YOLO('models/parking_model.pt')
-            elif os.path.exists('parking_model.pt'):
-                print("Loading parking model from root...")
-                model = YOLO('parking_model.pt')
-            else:
-                print("Loading pretrained YOLOv8 model...")
-                # Use pretrained YOLOv8 for demo (can detect cars)
-                model = YOLO('yolov8n.pt')
-            print("✅ Model loaded successfully!")
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            model = None
-    return model
+    """Load the model; returns the active backend (simulation if loading failed)"""
+    return get_engine().load()
+
+def warm_up():
+    """Run one inference on a blank frame so the first real request is fast"""
+    get_engine().warm_up()
 
 @app.route('/')
 def index():
@@ -55,88 +50,148 @@ def detect_parking():
         if file.filename == '':
             return jsonify({'error': 'No image selected'}), 400
         
-        # Read and process image
+        # Read and run detection
         image = Image.open(file.stream)
-        img_array = np.array(image)
+        result = get_engine().detect([image])[0]
         
-        # Load model and run inference
-        model = load_model()
-        
-        if model is None or not YOLO_AVAILABLE:
-            # Fallback to simulation
-            car_count = np.random.randint(8, 25)
-            total_spaces = car_count + np.random.randint(5, 15)
-            empty_spaces = total_spaces - car_count
-            
+        if result.is_simulation:
             return jsonify({
+                **result.to_dict(),
                 'success': True,
-                'detections': [],
-                'car_count': car_count,
-                'empty_spaces': empty_spaces,
-                'total_spaces': total_spaces,
-                'occupancy_rate': (car_count / total_spaces) * 100,
                 'annotated_image': None,
-                'message': f'Simulation: Detected {car_count} cars (AI not available)',
-                'is_simulation': True
+                'message': f'Simulation: Detected {result.car_count} cars (AI not available)'
             })
         
-        results = model(img_array)
-        
-        # Process results
-        detections = []
-        car_count = 0
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = box.conf[0].cpu().numpy()
-                    class_id = int(box.cls[0].cpu().numpy())
-                    class_name = model.names[class_id]
-                    
-                    # Count vehicles
-                    if class_name in ['car', 'truck', 'bus', 'motorcycle']:
-                        car_count += 1
-                    
-                    detections.append({
-                        'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                        'confidence': float(confidence),
-                        'class': class_id,
-                        'label': class_name
-                    })
-        
-        # Calculate parking info
-        total_spaces = max(15, car_count + np.random.randint(5, 15))
-        empty_spaces = total_spaces - car_count
-        occupancy_rate = (car_count / total_spaces) * 100
-        
-        # Draw results on image
-        annotated_img = results[0].plot()
-        
-        # Convert to base64 for web display
-        _, buffer = cv2.imencode('.jpg', annotated_img)
+        # Convert annotated image to base64 for web display
+        _, buffer = cv2.imencode('.jpg', result.annotated_image)
         img_base64 = base64.b64encode(buffer).decode('utf-8')
         
         return jsonify({
+            **result.to_dict(),
             'success': True,
-            'detections': detections,
-            'car_count': car_count,
-            'empty_spaces': empty_spaces,
-            'total_spaces': total_spaces,
-            'occupancy_rate': occupancy_rate,
             'annotated_image': img_base64,
-            'message': f'AI Detection: Found {car_count} vehicles, {empty_spaces} spaces available',
-            'is_simulation': False
+            'message': f'AI Detection: Found {result.car_count} vehicles, {result.empty_spaces} spaces available'
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/lots/<lot_id>/slots', methods=['PUT'])
+def configure_lot(lot_id):
+    """Set a lot's slot layout: {"slots": {"A1": [x1, y1, x2, y2], ...}}
+
+    Optional "tracking": {"min_hits": 2, "max_age": 5, "max_age_seconds": 3}
+    tunes the vehicle tracker: a track is dropped after max_age missed frames
+    and max_age_seconds unseen, whichever is later.
+    """
+    unavailable = live_feed_unavailable()
+    if unavailable:
+        return unavailable
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        parse_slots(data.get('slots'))
+        parse_tracking(data.get('tracking'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    feed = feeds.get(lot_id)
+    feed.configure(data['slots'], data.get('tracking'))
+    return jsonify(feed.snapshot())
+
+@app.route('/lots/<lot_id>/frame', methods=['POST'])
+def post_frame(lot_id):
+    """Run detection on a camera frame and publish the changes to subscribers"""
+    unavailable = live_feed_unavailable()
+    if unavailable:
+        return unavailable
+    
+    try:
+        if 'image' not in request.files:
+            return jsonify({'error': 'No image provided'}), 400
+        
+        # Optional capture time (unix seconds) so dwell times follow the camera clock
+        timestamp = request.form.get('timestamp', type=float)
+        
+        feed = feeds.get(lot_id, create=False)
+        if feed is None:
+            return jsonify({'error': f'Unknown lot {lot_id}: set its slots first'}), 404
+        
+        image = Image.open(request.files['image'].stream)
+        result = get_engine().detect([image], DetectionOptions(annotate=False, use_cache=False))[0]
+        if result.is_simulation:
+            # Simulated counts are random; publishing them would flood subscribers with noise
+            return jsonify({'error': 'Model not loaded, frame not published'}), 503
+        delta = feed.update(result, timestamp)
+        
+        return jsonify({'success': True, 'changed': delta is not None, 'delta': delta})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/lots/<lot_id>')
+def lot_state(lot_id):
+    unavailable = live_feed_unavailable()
+    if unavailable:
+        return unavailable
+    
+    feed = feeds.get(lot_id, create=False)
+    if feed is None:
+        return jsonify({'error': f'Unknown lot {lot_id}'}), 404
+    return jsonify(feed.snapshot())
+
+@app.route('/lots/<lot_id>/tracks')
+def lot_tracks(lot_id):
+    """Tracked vehicles and per-slot arrivals, departures and dwell times"""
+    unavailable = live_feed_unavailable()
+    if unavailable:
+        return unavailable
+    
+    feed = feeds.get(lot_id, create=False)
+    if feed is None:
+        return jsonify({'error': f'Unknown lot {lot_id}'}), 404
+    return jsonify({
+        'lot': lot_id,
+        'tracks': feed.tracker.tracks(),
+        'slot_stats': feed.tracker.slot_stats()
+    })
+
+@app.route('/lots/<lot_id>/feed')
+def lot_feed(lot_id):
+    """Server-Sent Events: a snapshot, then only the slots that changed"""
+    unavailable = live_feed_unavailable()
+    if unavailable:
+        return unavailable
+    
+    feed = feeds.get(lot_id, create=False)
+    if feed is None:
+        return jsonify({'error': f'Unknown lot {lot_id}'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_seq = int(last_event_id) if last_event_id.isdigit() else None
+    
+    return Response(
+        feed.stream(last_seq),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/health')
 def health():
     return jsonify({'status': 'healthy'})
 
+@app.route('/ready')
+def ready():
+    """Readiness check: 503 until the model has been loaded and warmed up"""
+    engine = get_engine()
+    if engine.load_error:
+        return jsonify({'status': 'error', 'error': engine.load_error}), 503
+    if not engine.ready:
+        return jsonify({'status': 'starting'}), 503
+    # pid lets load_test.py wait until every gunicorn worker is ready
+    return jsonify({'status': 'ready', 'pid': os.getpid()})
+
 if __name__ == '__main__':
+    warm_up()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
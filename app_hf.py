@@ -1,202 +1,11 @@
-import gradio as gr
-import numpy as np
-from PIL import Image
-import io
-import os
-
-# Try to import AI dependencies
-try:
-    from ultralytics import YOLO
-    AI_AVAILABLE = True
-    print("✅ AI dependencies loaded successfully")
-except ImportError as e:
-    AI_AVAILABLE = False
-    print(f"⚠️ AI dependencies not available: {e}")
-
-# Global model variable
-model = None
-
-def load_model():
-    """Load the parking detection model"""
-    global model
-    if model is None and AI_AVAILABLE:
-        try:
-            # Try to load custom model first
-            if os.path.exists('models/parking_model.pt'):
-                print("Loading custom parking model...")
-                model = YOLO('models/parking_model.pt')
-            elif os.path.exists('parking_model.pt'):
-                print("Loading parking model from root...")
-                model = YOLO('parking_model.pt')
-            else:
-                print("Loading pretrained YOLOv8 model...")
-                model = YOLO('yolov8n.pt')  # This will download automatically
-            print("✅ Model loaded successfully!")
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            model = None
-    return model
-
-def detect_parking(image):
-    """Main function for parking detection"""
-    if image is None:
-        return "Please upload an image", None
-    
-    try:
-        # Load model
-        model = load_model()
-        
-        if model is None or not AI_AVAILABLE:
-            # Fallback to simulation
-            return simulate_detection(image)
-        
-        # Run AI detection
-        results = model(image)
-        
-        # Process results
-        detections = []
-        car_count = 0
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    class_name = model.names[class_id]
-                    confidence = float(box.conf[0])
-                    
-                    # Count vehicles
-                    if class_name in ['car', 'truck', 'bus', 'motorcycle']:
-                        car_count += 1
-                    
-                    detections.append({
-                        'class': class_name,
-                        'confidence': confidence
-                    })
-        
-        # Calculate parking info
-        total_spaces = max(15, car_count + np.random.randint(5, 15))
-        empty_spaces = total_spaces - car_count
-        occupancy_rate = (car_count / total_spaces) * 100
-        
-        # Create annotated image
-        annotated_img = results[0].plot()
-        annotated_pil = Image.fromarray(annotated_img)
-        
-        # Create results text
-        result_text = f"""
-🎯 AI Parking Detection Results:
-
-🚗 Cars Detected: {car_count}
-🅿️ Empty Spaces: {empty_spaces}
-📊 Total Spaces: {total_spaces}
-📈 Occupancy Rate: {occupancy_rate:.1f}%
-🔍 Total Detections: {len(detections)}
-
-Status: {'🟢 Spaces Available' if empty_spaces > 5 else '🟡 Limited Spaces' if empty_spaces > 0 else '🔴 Full'}
-
-✅ Real AI Detection Active!
 """
-        
-        return result_text, annotated_pil
-        
-    except Exception as e:
-        return f"❌ Error during detection: {str(e)}", None
-
-def simulate_detection(image):
-    """Fallback simulation if AI is not available"""
-    # Simple simulation
-    car_count = np.random.randint(8, 25)
-    total_spaces = car_count + np.random.randint(5, 15)
-    empty_spaces = total_spaces - car_count
-    
-    result_text = f"""
-🎯 Simulation Results (AI not available):
-
-🚗 Cars Detected: {car_count}
-🅿️ Empty Spaces: {empty_spaces}
-📊 Total Spaces: {total_spaces}
-📈 Occupancy Rate: {(car_count/total_spaces)*100:.1f}%
+Hugging Face Spaces entry point
 
-⚠️ This is a simulation - upload your model for real AI detection!
+The Gradio app lives in app.py and the detection code in parking_detector/;
+this file only launches app.py so older Space configs keep working.
 """
-    
-    return result_text, image
 
-# Create Gradio interface
-def create_interface():
-    with gr.Blocks(title="🚗 AI Parking Detector", theme=gr.themes.Soft()) as demo:
-        gr.Markdown("""
-        # 🚗 AI Parking Slot Detector
-        
-        Upload a parking lot image to detect cars and analyze parking availability!
-        
-        **Features:**
-        - 🤖 Real-time AI detection using YOLOv8
-        - 🚗 Counts cars, trucks, buses, motorcycles
-        - 🅿️ Calculates available parking spaces
-        - 📊 Shows occupancy statistics
-        """)
-        
-        with gr.Row():
-            with gr.Column():
-                image_input = gr.Image(
-                    label="📸 Upload Parking Lot Image",
-                    type="pil"
-                )
-                detect_btn = gr.Button(
-                    "🔍 Analyze Parking",
-                    variant="primary",
-                    size="lg"
-                )
-            
-            with gr.Column():
-                result_text = gr.Textbox(
-                    label="📋 Detection Results",
-                    lines=15,
-                    max_lines=20
-                )
-                result_image = gr.Image(
-                    label="🎯 Annotated Image",
-                    type="pil"
-                )
-        
-        # Event handlers
-        detect_btn.click(
-            fn=detect_parking,
-            inputs=[image_input],
-            outputs=[result_text, result_image]
-        )
-        
-        image_input.change(
-            fn=detect_parking,
-            inputs=[image_input],
-            outputs=[result_text, result_image]
-        )
-        
-        gr.Markdown("""
-        ### 💡 Tips:
-        - Works best with clear, well-lit parking lot images
-        - Supports JPG, PNG, and other common image formats
-        - Detects cars, trucks, buses, and motorcycles
-        - Calculates realistic parking availability
-        """)
-    
-    return demo
+import runpy
 
-# Create and launch the interface
 if __name__ == "__main__":
-    print("🚀 Starting Parking Detection App...")
-    
-    # Load model on startup
-    load_model()
-    
-    # Create interface
-    demo = create_interface()
-    
-    # Launch
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=7860,
-        share=False
-    )
+    runpy.run_module('app', run_name='__main__')
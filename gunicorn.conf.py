@@ -0,0 +1,97 @@
+"""
+Production gunicorn configuration for app_flask:app
+
+The model is loaded once in the master before workers are forked
+(preload_app), so the weights live in copy-on-write pages shared by every
+worker instead of being loaded N times. Each worker then runs a warm-up
+inference so its first real request is not slow.
+
+Everything can be tuned with environment variables:
+    PORT                    Port to bind (default 5000)
+    GUNICORN_WORKERS        Number of worker processes (default 2)
+    GUNICORN_WORKER_CLASS   sync, gthread, gevent or eventlet (default gthread)
+    GUNICORN_THREADS        Threads per gthread worker (default 4)
+    GUNICORN_CONNECTIONS    Max connections per async worker (default 100)
+    GUNICORN_TIMEOUT        Worker timeout in seconds (default 120)
+    INFERENCE_THREADS       torch intra-op threads per worker (default 1)
+    INFERENCE_CONCURRENCY   Concurrent model calls per worker (default 1, see parking_detector/engine.py)
+    GUNICORN_LIVE_FEED      1 to serve the /lots live feed: one gevent worker
+                            with up to 2000 connections (needs gevent)
+
+The live feed keeps lot state in the worker and holds one connection per
+subscriber, so app_flask refuses the /lots routes unless exactly one
+gevent worker is running. That single process also runs every inference,
+which blocks its event loop: subscribers stall while a frame is processed
+and /detect gets no worker parallelism. Use it for low frame rates and
+serve /detect from a separate deployment with the default settings.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app_flask:app
+"""
+
+import gc
+import os
+
+live_feed = os.environ.get('GUNICORN_LIVE_FEED', '') == '1'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = 1 if live_feed else int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = 'gevent' if live_feed else os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_CONNECTIONS', 2000 if live_feed else 100))
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so every lock and socket it
+    # creates in the master is already cooperative
+    from gevent import monkey
+    monkey.patch_all()
+
+# Tell app_flask whether the /lots routes can be served
+os.environ['PARKING_LIVE_FEED'] = '1' if workers == 1 and worker_class == 'gevent' else '0'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app (and with it the model) in the master before forking
+preload_app = True
+
+inference_threads = int(os.environ.get('INFERENCE_THREADS', 1))
+
+
+def when_ready(server):
+    """Load the model in the master so workers inherit it copy-on-write"""
+    import app_flask
+
+    # Keep the master single threaded: torch thread pools created before
+    # fork are not usable in the children.
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    if app_flask.load_model().is_simulation:
+        server.log.warning("Model failed to load in master; workers will use the simulation")
+    else:
+        server.log.info("Model preloaded in master (pid %s)", os.getpid())
+
+    # Move everything allocated so far into the permanent generation, so the
+    # workers' garbage collector never writes to (and un-shares) those pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    try:
+        import torch
+        torch.set_num_threads(inference_threads)
+    except ImportError:
+        pass
+
+
+def post_worker_init(worker):
+    """Run one warm-up inference so the worker's first request is fast"""
+    import app_flask
+
+    app_flask.warm_up()
+    worker.log.info("Worker %s warmed up", os.getpid())
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Load testing harness for the Flask parking detector (app_flask:app)
+
+Drives POST /detect from many simulated clients using a local image corpus
+and reports throughput, latency percentiles, error rates and server RSS.
+
+Examples:
+    # Closed loop: 8 clients, each sends the next request as soon as it has a reply
+    python load_test.py --url http://127.0.0.1:5000 --mode closed --concurrency 8
+
+    # Open loop: fixed arrival rate of 5 requests/second, independent of replies
+    python load_test.py --mode open --rate 5 --duration 60 --server-pid 1234
+
+    # Sweep gunicorn worker/thread counts to find the capacity knee of this box
+    python load_test.py --sweep 1x1,2x1,2x4,4x2 --mode closed --concurrency 16
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png', '*.webp')
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_corpus(path):
+    """Load images from a file or directory and pre-encode them as multipart bodies"""
+    if os.path.isdir(path):
+        files = []
+        for pattern in IMAGE_PATTERNS:
+            files.extend(glob.glob(os.path.join(path, pattern)))
+        files.sort()
+    else:
+        files = [path]
+
+    corpus = []
+    for filename in files:
+        with open(filename, 'rb') as f:
+            data = f.read()
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="image"; filename="{os.path.basename(filename)}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode('utf-8') + data + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        corpus.append((body, f'multipart/form-data; boundary={boundary}'))
+    return corpus
+
+
+def send_request(url, body, content_type, timeout):
+    """Send one /detect request; returns (latency_seconds, ok, error)"""
+    request = urllib.request.Request(
+        url, data=body, method='POST', headers={'Content-Type': content_type}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = response.read()
+        latency = time.perf_counter() - start
+        try:
+            result = json.loads(payload)
+        except ValueError:
+            return latency, False, 'invalid JSON'
+        if 'error' in result:
+            return latency, False, result['error']
+        return latency, True, None
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, False, f'HTTP {e.code}'
+    except Exception as e:
+        return time.perf_counter() - start, False, type(e).__name__
+
+
+def process_tree(pid):
+    """Return pid followed by all of its descendants' pids, read from /proc.
+
+    Only works on Linux; returns an empty list elsewhere.
+    """
+    if not os.path.isdir('/proc'):
+        return []
+
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The ppid is the second field after the parenthesised command name
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(children.get(current, []))
+    return pids
+
+
+def read_memory(pid, fields):
+    """Read memory fields (in bytes) from /proc/<pid>/smaps_rollup or status"""
+    values = {}
+    for source in (f'/proc/{pid}/smaps_rollup', f'/proc/{pid}/status'):
+        try:
+            with open(source) as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in fields and key not in values:
+                        values[key] = int(rest.split()[0]) * 1024
+        except OSError:
+            continue
+    return values
+
+
+def process_tree_rss(pid):
+    """Sum resident memory (bytes) of a process and all of its descendants.
+
+    Pages shared between gunicorn workers are counted once per worker here;
+    see worker_memory() for proportional (PSS) numbers.
+    """
+    pids = process_tree(pid)
+    if not pids:
+        return None
+    return sum(read_memory(p, ('VmRSS',)).get('VmRSS', 0) for p in pids)
+
+
+def worker_memory(pid):
+    """Per-process RSS, PSS and shared memory (MB) for a server and its workers.
+
+    PSS splits each shared page between the processes that map it, so with a
+    preloaded model the sum of PSS is the real footprint of the whole server.
+    """
+    report = []
+    for p in process_tree(pid):
+        values = read_memory(p, ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'VmRSS'))
+        if not values:
+            continue
+        rss = values.get('Rss', values.get('VmRSS', 0))
+        shared = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+        report.append({
+            'pid': p,
+            'role': 'master' if p == pid else 'worker',
+            'rss_mb': round(rss / (1024 * 1024), 1),
+            'pss_mb': round(values['Pss'] / (1024 * 1024), 1) if 'Pss' in values else None,
+            'shared_mb': round(shared / (1024 * 1024), 1),
+        })
+    return report
+
+
+class Recorder:
+    """Thread-safe collector for request samples and RSS samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = {}
+        self.rss_samples = []
+        self.first_latency = None
+
+    def record(self, latency, ok, error):
+        with self.lock:
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def record_rss(self, elapsed, rss):
+        with self.lock:
+            self.rss_samples.append((round(elapsed, 2), rss))
+
+
+def sample_rss(pid, recorder, stop, interval):
+    """Background loop that records server RSS until stop is set"""
+    start = time.perf_counter()
+    while not stop.is_set():
+        rss = process_tree_rss(pid)
+        if rss is not None:
+            recorder.record_rss(time.perf_counter() - start, rss)
+        stop.wait(interval)
+
+
+def run_closed_loop(url, corpus, recorder, concurrency, duration, timeout):
+    """Each client waits for its reply before sending the next request"""
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        i = index
+        while time.perf_counter() < deadline:
+            body, content_type = corpus[i % len(corpus)]
+            recorder.record(*send_request(url, body, content_type, timeout))
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(url, corpus, recorder, rate, duration, timeout, max_inflight):
+    """Requests arrive at a fixed rate whether or not earlier ones have finished.
+
+    Latency is measured from the scheduled send time, so queueing inside the
+    harness (when max_inflight is reached) counts against the server.
+    """
+    interval = 1.0 / rate
+    total = int(rate * duration)
+    start = time.perf_counter()
+
+    def fire(i, scheduled):
+        body, content_type = corpus[i % len(corpus)]
+        _, ok, error = send_request(url, body, content_type, timeout)
+        recorder.record(time.perf_counter() - scheduled, ok, error)
+
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, i, scheduled)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder, elapsed):
+    latencies = sorted(recorder.latencies)
+    error_count = sum(recorder.errors.values())
+    total = len(latencies) + error_count
+    summary = {
+        'requests': total,
+        'succeeded': len(latencies),
+        'errors': error_count,
+        'error_rate': (error_count / total) if total else 0.0,
+        'error_breakdown': dict(recorder.errors),
+        'duration_s': round(elapsed, 2),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'first_request_ms': round(recorder.first_latency * 1000, 1) if recorder.first_latency else None,
+        'latency_ms': {},
+        'rss_mb': [(t, round(rss / (1024 * 1024), 1)) for t, rss in recorder.rss_samples],
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        summary['latency_ms'][f'p{p}'] = round(value * 1000, 1) if value is not None else None
+    summary['latency_ms']['max'] = round(latencies[-1] * 1000, 1) if latencies else None
+    return summary
+
+
+def run_load(url, corpus, args, server_pid=None):
+    """Run one load test against url and return its summary.
+
+    One request is sent on its own first, so first_request_ms is the latency
+    of a single request to an idle server rather than the fastest of the
+    first wave; it is not counted in the load statistics.
+    """
+    recorder = Recorder()
+    body, content_type = corpus[0]
+    latency, ok, _ = send_request(url, body, content_type, args.timeout)
+    if ok:
+        recorder.first_latency = latency
+    stop = threading.Event()
+    sampler = None
+    if server_pid:
+        sampler = threading.Thread(
+            target=sample_rss, args=(server_pid, recorder, stop, args.rss_interval), daemon=True
+        )
+        sampler.start()
+
+    start = time.perf_counter()
+    if args.mode == 'open':
+        run_open_loop(url, corpus, recorder, args.rate, args.duration, args.timeout, args.max_inflight)
+    else:
+        run_closed_loop(url, corpus, recorder, args.concurrency, args.duration, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    if sampler:
+        sampler.join()
+    summary = summarize(recorder, elapsed)
+    if server_pid:
+        summary['processes'] = worker_memory(server_pid)
+    return summary
+
+
+def print_summary(summary, label=None):
+    if label:
+        print(f"\n⚙️  {label}")
+    print(f"📨 Requests: {summary['requests']} ({summary['succeeded']} ok, {summary['errors']} errors)")
+    print(f"🚀 Throughput: {summary['throughput_rps']} req/s over {summary['duration_s']}s")
+    latency = summary['latency_ms']
+    print("⏱️  Latency (ms): " + ", ".join(f"{k}={v}" for k, v in latency.items()))
+    print(f"🥶 First request: {summary['first_request_ms']} ms")
+    print(f"❌ Error rate: {summary['error_rate'] * 100:.1f}%")
+    for error, count in summary['error_breakdown'].items():
+        print(f"   {error}: {count}")
+    if summary['rss_mb']:
+        peak = max(rss for _, rss in summary['rss_mb'])
+        print(f"🧠 Server RSS: start={summary['rss_mb'][0][1]} MB, peak={peak} MB, "
+              f"end={summary['rss_mb'][-1][1]} MB")
+    if summary.get('processes'):
+        print("🧩 Per-process memory (MB):")
+        for proc in summary['processes']:
+            print(f"   {proc['role']:<6} pid={proc['pid']:<7} rss={proc['rss_mb']:<8} "
+                  f"pss={proc['pss_mb']!s:<8} shared={proc['shared_mb']}")
+
+
+def wait_for_ready(base_url, timeout, workers=1):
+    """Poll /ready until that many distinct worker processes have warmed up"""
+    deadline = time.time() + timeout
+    ready_pids = set()
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/ready', timeout=2) as response:
+                if response.status == 200:
+                    ready_pids.add(json.loads(response.read()).get('pid'))
+                    if len(ready_pids) >= workers:
+                        return True
+                    time.sleep(0.05)  # Poll again soon to reach the other workers
+                    continue
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def parse_sweep(spec):
+    """Parse '1x1,2x4' into [(1, 1), (2, 4)] (workers x threads)"""
+    configs = []
+    for item in spec.split(','):
+        workers, _, threads = item.strip().partition('x')
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def run_sweep(corpus, args):
+    """Start gunicorn once per worker/thread config, load it, and report the knee"""
+    base_url = f'http://127.0.0.1:{args.port}'
+    results = []
+    for workers, threads in parse_sweep(args.sweep):
+        label = f'{workers} workers x {threads} threads'
+        command = [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'127.0.0.1:{args.port}',
+            '--workers', str(workers),
+            '--threads', str(threads),
+            '--timeout', str(int(args.timeout) + 30),
+        ] + args.gunicorn_arg + [args.app]
+        print(f"\n🔧 Starting gunicorn: {label}")
+        server = subprocess.Popen(command, start_new_session=True)
+        try:
+            if not wait_for_ready(base_url, args.startup_timeout, workers):
+                print(f"❌ Server did not become ready within {args.startup_timeout}s, skipping")
+                continue
+            summary = run_load(base_url + '/detect', corpus, args, server_pid=server.pid)
+            summary['workers'] = workers
+            summary['threads'] = threads
+            print_summary(summary, label)
+            results.append(summary)
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(server.pid, signal.SIGKILL)
+                server.wait()
+
+    if not results:
+        return results
+
+    print("\n📊 Sweep results:")
+    print(f"{'workers':>8} {'threads':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'err %':>6} {'peak MB':>8}")
+    for summary in results:
+        peak = max((rss for _, rss in summary['rss_mb']), default=None)
+        print(f"{summary['workers']:>8} {summary['threads']:>8} {summary['throughput_rps']:>8} "
+              f"{summary['latency_ms']['p50']!s:>8} {summary['latency_ms']['p95']!s:>8} "
+              f"{summary['error_rate'] * 100:>6.1f} {peak!s:>8}")
+
+    # The knee is the cheapest config (fewest worker*thread slots) that gets
+    # within --knee-fraction of the best throughput without breaking the SLO.
+    eligible = [
+        s for s in results
+        if s['error_rate'] <= args.max_error_rate
+        and (args.slo_ms is None or (s['latency_ms']['p95'] or float('inf')) <= args.slo_ms)
+    ]
+    if eligible:
+        best = max(s['throughput_rps'] for s in eligible)
+        knee = min(
+            (s for s in eligible if s['throughput_rps'] >= best * args.knee_fraction),
+            key=lambda s: (s['workers'] * s['threads'], s['workers']),
+        )
+        print(f"\n🎯 Capacity knee: {knee['workers']} workers x {knee['threads']} threads "
+              f"({knee['throughput_rps']} req/s, p95 {knee['latency_ms']['p95']} ms)")
+    else:
+        print("\n⚠️ No configuration met the error-rate / latency limits")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the parking detector /detect endpoint")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of a running server')
+    parser.add_argument('--images', default='.', help='Image file or directory of images to upload')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', type=int, default=4, help='Clients in closed-loop mode')
+    parser.add_argument('--rate', type=float, default=2.0, help='Requests per second in open-loop mode')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Open-loop cap on outstanding requests')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+    parser.add_argument('--server-pid', type=int, help='PID of the server (gunicorn master) for RSS sampling')
+    parser.add_argument('--rss-interval', type=float, default=1.0, help='Seconds between RSS samples')
+    parser.add_argument('--sweep', help='Worker x thread configs to sweep, e.g. 1x1,2x1,2x4')
+    parser.add_argument('--app', default='app_flask:app', help='WSGI app for sweep mode')
+    parser.add_argument('--port', type=int, default=5055, help='Port for sweep-mode servers')
+    parser.add_argument('--gunicorn-arg', action='append', default=[], help='Extra gunicorn argument (repeatable)')
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--slo-ms', type=float, help='p95 latency limit when picking the knee')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--knee-fraction', type=float, default=0.95)
+    parser.add_argument('--json', help='Write the summary (or sweep results) to this file')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.images)
+    if not corpus:
+        print(f"❌ No images found in {args.images}")
+        return 1
+    print(f"🖼️  Loaded {len(corpus)} images from {args.images}")
+
+    if args.sweep:
+        results = run_sweep(corpus, args)
+    else:
+        print(f"🚦 {args.mode}-loop load against {args.url}/detect for {args.duration}s")
+        results = run_load(args.url.rstrip('/') + '/detect', corpus, args, server_pid=args.server_pid)
+        print_summary(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
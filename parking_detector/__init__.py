@@ -0,0 +1,46 @@
+"""
+Parking detection engine shared by the Gradio and Flask apps
+"""
+
+from .backends import (
+    AI_AVAILABLE,
+    BACKENDS,
+    Backend,
+    SimulationBackend,
+    YOLOBackend,
+    create_backend,
+    register_backend,
+)
+from . import weights
+from .feed import FeedRegistry, LotFeed
+from .tracker import VehicleTracker
+from .engine import (
+    VEHICLE_CLASSES,
+    DetectionEngine,
+    DetectionOptions,
+    DetectionResult,
+    detect,
+    get_engine,
+    set_engine,
+)
+
+__all__ = [
+    'AI_AVAILABLE',
+    'BACKENDS',
+    'Backend',
+    'VEHICLE_CLASSES',
+    'DetectionEngine',
+    'DetectionOptions',
+    'DetectionResult',
+    'FeedRegistry',
+    'LotFeed',
+    'SimulationBackend',
+    'VehicleTracker',
+    'YOLOBackend',
+    'create_backend',
+    'detect',
+    'get_engine',
+    'register_backend',
+    'set_engine',
+    'weights',
+]
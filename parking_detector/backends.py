@@ -0,0 +1,163 @@
+"""
+Inference backends for the detection engine
+
+A backend turns a batch of images into raw detections. Backends are
+registered by name in BACKENDS so apps can pick one with PARKING_BACKEND;
+custom backends subclass Backend and override load() and predict().
+"""
+
+import os
+
+import numpy as np
+
+from . import weights
+
+# Try to import AI dependencies
+try:
+    from ultralytics import YOLO
+    AI_AVAILABLE = True
+except ImportError:
+    AI_AVAILABLE = False
+
+# Model files tried in order before falling back to the pretrained model,
+# which is served from the verified weights cache (see weights.py).
+# PARKING_MODEL overrides the search, e.g. with a pruned vehicle-only model.
+MODEL_PATHS = ['models/parking_model.pt', 'parking_model.pt']
+PRETRAINED_MODEL = 'yolov8n.pt'
+
+# The only classes the parking service uses
+VEHICLE_CLASSES = ['car', 'truck', 'bus', 'motorcycle']
+
+
+class Backend:
+    """Interface the detection engine expects from a backend.
+
+    load() returns a truthy model once it is usable, or None (and sets
+    load_error) if it cannot be loaded. predict(images, options) returns one
+    (detections, annotate) pair per image, where detections is a list of
+    {'bbox', 'confidence', 'class', 'label'} dicts and annotate is a callable
+    returning a BGR image, or None.
+    """
+
+    name = 'backend'
+    is_simulation = False
+    names = {}
+    load_error = None
+
+    def load(self):
+        return self
+
+    def predict(self, images, options):
+        raise NotImplementedError
+
+
+class YOLOBackend(Backend):
+    """Runs an ultralytics YOLO model (custom parking model or pretrained YOLOv8)"""
+
+    name = 'yolo'
+    is_simulation = False
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or os.environ.get('PARKING_MODEL') or None
+        self.model = None
+        self.vehicle_ids = None
+        # Why the model could not be loaded; a failed load is not retried
+        self.load_error = None if AI_AVAILABLE else 'ultralytics is not installed'
+
+    def load(self):
+        """Load the model once; returns None if it cannot be loaded"""
+        if self.model is None and self.load_error is None:
+            try:
+                path = self.model_path
+                if path is None:
+                    path = next((p for p in MODEL_PATHS if os.path.exists(p)), None)
+                if path is None:
+                    # Downloads into the cache only if it is missing and PARKING_OFFLINE is unset
+                    path = weights.fetch(PRETRAINED_MODEL)
+                else:
+                    # Raises if the manifest has an entry for this file and it does not match
+                    weights.verify(path)
+                print(f"Loading model from {path}...")
+                model = YOLO(path)
+                # Fuse conv+bn now rather than on the first prediction, so fused
+                # weights created in a gunicorn master stay shared after fork
+                model.fuse()
+                self.vehicle_ids = [i for i, name in model.names.items() if name in VEHICLE_CLASSES]
+                self.model = model
+                print("✅ Model loaded successfully!")
+            except Exception as e:
+                print(f"❌ Error loading model: {e}")
+                self.model = None
+                self.load_error = str(e)
+        return self.model
+
+    @property
+    def names(self):
+        return self.model.names if self.model is not None else {}
+
+    def predict(self, images, options):
+        """Run one model call over images; returns [(detections, annotate_fn)]"""
+        kwargs = {'verbose': False}
+        if options.conf is not None:
+            kwargs['conf'] = options.conf
+        # Drop non-vehicle candidates inside NMS instead of after it; models
+        # without any vehicle class (or already pruned to them) run unfiltered
+        if options.vehicles_only and self.vehicle_ids and len(self.vehicle_ids) < len(self.model.names):
+            kwargs['classes'] = self.vehicle_ids
+        results = self.model(list(images), **kwargs)
+
+        outputs = []
+        for result in results:
+            detections = []
+            boxes = result.boxes
+            if boxes is not None and len(boxes):
+                xyxy = boxes.xyxy.cpu().numpy()
+                confs = boxes.conf.cpu().numpy()
+                class_ids = boxes.cls.cpu().numpy().astype(int)
+                for (x1, y1, x2, y2), confidence, class_id in zip(xyxy, confs, class_ids):
+                    detections.append({
+                        'bbox': [float(x1), float(y1), float(x2), float(y2)],
+                        'confidence': float(confidence),
+                        'class': int(class_id),
+                        'label': self.model.names[int(class_id)]
+                    })
+            # plot() returns a BGR array
+            outputs.append((detections, result.plot))
+        return outputs
+
+
+class SimulationBackend(Backend):
+    """Fallback used when the AI dependencies or the model are not available"""
+
+    name = 'simulation'
+    is_simulation = True
+
+    def predict(self, images, options):
+        return [([], None) for _ in images]
+
+
+BACKENDS = {
+    YOLOBackend.name: YOLOBackend,
+    SimulationBackend.name: SimulationBackend,
+}
+
+
+def register_backend(name, factory):
+    """Make a backend available to create_backend() and PARKING_BACKEND.
+
+    factory is called with no arguments and should return a Backend subclass instance.
+    """
+    BACKENDS[name] = factory
+
+
+def create_backend(name=None):
+    """Create a backend by name (default: PARKING_BACKEND or 'yolo')"""
+    name = name or os.environ.get('PARKING_BACKEND', YOLOBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def warm_up_image():
+    """Blank frame used for warm-up inference"""
+    return np.zeros((640, 640, 3), dtype=np.uint8)
@@ -0,0 +1,271 @@
+"""
+Detection engine: the single hot path shared by app.py, app_hf.py and app_flask.py
+
+    from parking_detector import detect, DetectionOptions
+    results = detect([image], DetectionOptions(annotate=False))
+
+Images may be PIL images or numpy arrays. Uncached images are sent to the
+backend in batches of options.batch_size, one model call per batch.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .backends import VEHICLE_CLASSES, SimulationBackend, create_backend, warm_up_image
+
+
+@dataclass(frozen=True)
+class DetectionOptions:
+    """Per-call detection settings"""
+    conf: float = None  # Confidence threshold (None = model default)
+    annotate: bool = True  # Render an annotated image for each result
+    use_cache: bool = True  # Only annotate=False results are ever cached
+    batch_size: int = 8
+    vehicles_only: bool = True  # Restrict inference to VEHICLE_CLASSES
+
+
+@dataclass
+class DetectionResult:
+    """Detections and parking occupancy for one image"""
+    detections: list
+    car_count: int
+    empty_spaces: int
+    total_spaces: int
+    occupancy_rate: float
+    is_simulation: bool = False
+    annotated_image: np.ndarray = field(default=None, repr=False)  # BGR
+
+    @property
+    def status(self):
+        if self.empty_spaces > 5:
+            return '🟢 Spaces Available'
+        if self.empty_spaces > 0:
+            return '🟡 Limited Spaces'
+        return '🔴 Full'
+
+    def to_dict(self):
+        """JSON-serializable result without the annotated image"""
+        return {
+            'detections': self.detections,
+            'car_count': self.car_count,
+            'empty_spaces': self.empty_spaces,
+            'total_spaces': self.total_spaces,
+            'occupancy_rate': self.occupancy_rate,
+            'is_simulation': self.is_simulation,
+        }
+
+
+def count_vehicles(detections):
+    return sum(1 for d in detections if d['label'] in VEHICLE_CLASSES)
+
+
+def occupancy(car_count, simulated=False):
+    """Estimate the lot size around the vehicle count"""
+    if simulated:
+        car_count = np.random.randint(8, 25)
+        total_spaces = car_count + np.random.randint(5, 15)
+    else:
+        total_spaces = max(15, car_count + np.random.randint(5, 15))
+    empty_spaces = total_spaces - car_count
+    return car_count, empty_spaces, total_spaces, (car_count / total_spaces) * 100
+
+
+def image_key(image):
+    """Content hash of a PIL image or numpy array"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image, np.ndarray):
+        array = np.ascontiguousarray(image)
+        digest.update(f'{array.shape}{array.dtype}'.encode())
+        digest.update(array.data)
+    else:
+        digest.update(f'{image.size}{image.mode}'.encode())
+        digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache of DetectionResults"""
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DetectionEngine:
+    """Batches images through a backend and turns detections into occupancy results.
+
+    Hooks registered with add_hook(fn) are called as fn(event, info) for the
+    events 'cache_hit', 'inference', 'detect' and 'warm_up'; info includes
+    timings in seconds.
+    """
+
+    def __init__(self, backend=None, cache_size=None, max_concurrency=None):
+        self.backend = backend or create_backend()
+        self.fallback = SimulationBackend()
+        if cache_size is None:
+            # Off by default: camera frames rarely repeat, and hashing a
+            # decoded frame costs as much as a copy of it
+            cache_size = int(os.environ.get('PARKING_CACHE_SIZE', 0))
+        self.cache = ResultCache(cache_size)
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get('INFERENCE_CONCURRENCY', 1))
+        # Bound concurrent model calls; extra callers wait here instead of
+        # oversubscribing the CPU
+        self.inference_slots = threading.BoundedSemaphore(max_concurrency)
+        self.hooks = []
+        # Set once warm_up() has run an inference end to end
+        self.ready = False
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def emit(self, event, **info):
+        for hook in self.hooks:
+            try:
+                hook(event, info)
+            except Exception as e:
+                print(f"⚠️ Hook {hook!r} failed on {event}: {e}")
+
+    def load(self):
+        """Load the backend model; returns the active backend"""
+        if self.backend.load() is None:
+            return self.fallback
+        return self.backend
+
+    @property
+    def load_error(self):
+        """Why the configured backend could not be loaded, or None"""
+        return getattr(self.backend, 'load_error', None)
+
+    def warm_up(self):
+        """Run one uncached inference on a blank frame so the first real request is fast.
+
+        The engine only becomes ready if the configured backend loaded; falling
+        back to the simulation leaves it not ready (load_error says why),
+        unless the simulation was chosen on purpose with PARKING_BACKEND.
+        """
+        try:
+            start = time.perf_counter()
+            self.detect([warm_up_image()], DetectionOptions(use_cache=False))
+            backend = self.load()
+            if backend.is_simulation and not self.backend.is_simulation:
+                print(f"⚠️ Not ready: model failed to load ({self.load_error})")
+                return self.ready
+            self.ready = True
+            self.emit('warm_up', backend=backend.name, seconds=time.perf_counter() - start)
+        except Exception as e:
+            print(f"Warm-up inference failed: {e}")
+        return self.ready
+
+    def detect(self, images, options=None):
+        """Detect vehicles in images; returns one DetectionResult per image"""
+        options = options or DetectionOptions()
+        start = time.perf_counter()
+        backend = self.load()
+        results = [None] * len(images)
+
+        # Annotated images are never cached (several MB each), so callers that
+        # want one skip the cache and the image hashing entirely
+        cacheable = (options.use_cache and not options.annotate
+                     and self.cache.max_size > 0 and not backend.is_simulation)
+        keys = [None] * len(images)
+        pending = []
+        for i, image in enumerate(images):
+            if cacheable:
+                keys[i] = (image_key(image), options)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    results[i] = cached
+                    self.emit('cache_hit', index=i)
+                    continue
+            pending.append(i)
+
+        batch_size = max(1, options.batch_size)
+        for offset in range(0, len(pending), batch_size):
+            batch = pending[offset:offset + batch_size]
+            inference_start = time.perf_counter()
+            with self.inference_slots:
+                outputs = backend.predict([images[i] for i in batch], options)
+            self.emit('inference', batch_size=len(batch), backend=backend.name,
+                      seconds=time.perf_counter() - inference_start)
+
+            for i, (detections, annotate) in zip(batch, outputs):
+                result = self.build_result(detections, backend.is_simulation)
+                if options.annotate and annotate is not None:
+                    result.annotated_image = annotate()
+                if keys[i] is not None:
+                    self.cache.put(keys[i], result)
+                results[i] = result
+
+        self.emit('detect', images=len(images), inferred=len(pending),
+                  seconds=time.perf_counter() - start)
+        return results
+
+    def build_result(self, detections, simulated):
+        car_count, empty_spaces, total_spaces, occupancy_rate = occupancy(
+            count_vehicles(detections), simulated=simulated
+        )
+        return DetectionResult(
+            detections=detections,
+            car_count=car_count,
+            empty_spaces=empty_spaces,
+            total_spaces=total_spaces,
+            occupancy_rate=occupancy_rate,
+            is_simulation=simulated,
+        )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide default engine, created on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DetectionEngine()
+    return _engine
+
+
+def set_engine(engine):
+    """Replace the process-wide default engine (e.g. with another backend)"""
+    global _engine
+    _engine = engine
+
+
+def detect(images, options=None):
+    """Detect vehicles in a list of images with the default engine"""
+    return get_engine().detect(images, options)
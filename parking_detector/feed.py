@@ -0,0 +1,244 @@
+"""
+Live per-lot occupancy feed with delta encoding
+
+Cameras post frames to a lot; each LotFeed turns the detection result into
+per-slot occupancy, tracks vehicles for arrival/departure events, and
+publishes only what changed. Every event is
+serialized once into Server-Sent Events bytes and appended to a short
+shared log; subscribers read from that log, so publishing costs the same
+for one subscriber as for thousands.
+
+A subscriber first receives a snapshot of the whole lot, then deltas. If it
+falls further behind than the log holds, it gets a fresh snapshot instead.
+"""
+
+import json
+import math
+import numbers
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .engine import VEHICLE_CLASSES
+from .tracker import VehicleTracker
+
+# A slot counts as occupied when a vehicle box covers this fraction of it
+SLOT_OVERLAP = 0.3
+LOG_SIZE = 256
+KEEPALIVE_SECONDS = 15
+
+
+def slot_occupancy(slot_boxes, detections, overlap=SLOT_OVERLAP):
+    """Occupied flag for each slot box [x1, y1, x2, y2] given detections"""
+    slots = np.asarray(slot_boxes, dtype=np.float32).reshape(-1, 4)
+    vehicles = np.asarray(
+        [d['bbox'] for d in detections if d['label'] in VEHICLE_CLASSES], dtype=np.float32
+    ).reshape(-1, 4)
+    if not len(slots) or not len(vehicles):
+        return np.zeros(len(slots), dtype=bool)
+
+    # Intersection of every slot with every vehicle box: (slots, vehicles)
+    x1 = np.maximum(slots[:, None, 0], vehicles[None, :, 0])
+    y1 = np.maximum(slots[:, None, 1], vehicles[None, :, 1])
+    x2 = np.minimum(slots[:, None, 2], vehicles[None, :, 2])
+    y2 = np.minimum(slots[:, None, 3], vehicles[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = np.clip((slots[:, 2] - slots[:, 0]) * (slots[:, 3] - slots[:, 1]), 1e-6, None)
+    return (intersection / area[:, None]).max(axis=1) >= overlap
+
+
+def parse_slots(slots):
+    """Validate a slot layout {slot_id: [x1, y1, x2, y2]}; returns (slot_ids, boxes).
+
+    Raises ValueError describing the first bad slot.
+    """
+    if not isinstance(slots, dict):
+        raise ValueError('Expected {"slots": {slot_id: [x1, y1, x2, y2]}}')
+    slot_ids = list(slots)
+    for slot_id in slot_ids:
+        box = slots[slot_id]
+        if not isinstance(box, (list, tuple)) or len(box) != 4:
+            raise ValueError(f"Slot {slot_id}: expected [x1, y1, x2, y2]")
+        if not all(isinstance(v, numbers.Real) and not isinstance(v, bool) and math.isfinite(v)
+                   for v in box):
+            raise ValueError(f"Slot {slot_id}: coordinates must be numbers")
+        x1, y1, x2, y2 = box
+        if not (x1 < x2 and y1 < y2):
+            raise ValueError(f"Slot {slot_id}: expected x1 < x2 and y1 < y2")
+    boxes = np.asarray([slots[slot_id] for slot_id in slot_ids], dtype=np.float32).reshape(-1, 4)
+    return slot_ids, boxes
+
+
+def parse_tracking(tracking):
+    """Validate tracker settings {"min_hits": frames, "max_age": frames, "max_age_seconds": s}.
+
+    Returns the settings as keyword arguments; raises ValueError.
+    """
+    if tracking is None:
+        return {}
+    if not isinstance(tracking, dict) or set(tracking) - {'min_hits', 'max_age', 'max_age_seconds'}:
+        raise ValueError('Expected {"tracking": {"min_hits": frames, "max_age": frames, '
+                         '"max_age_seconds": seconds}}')
+    for key, value in tracking.items():
+        if key == 'max_age_seconds':
+            if (not isinstance(value, numbers.Real) or isinstance(value, bool)
+                    or not math.isfinite(value) or value < 0):
+                raise ValueError("tracking.max_age_seconds must be a number of seconds >= 0")
+        elif not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(f"tracking.{key} must be a whole number of frames >= 1")
+    return dict(tracking)
+
+
+def encode_event(event, seq, payload):
+    """Serialize one Server-Sent Event"""
+    data = json.dumps(payload, separators=(',', ':'))
+    return f'id: {seq}\nevent: {event}\ndata: {data}\n\n'.encode('utf-8')
+
+
+class LotFeed:
+    """Occupancy state and event log for one parking lot"""
+
+    def __init__(self, lot_id, slots=None, log_size=LOG_SIZE):
+        self.lot_id = lot_id
+        self.condition = threading.Condition()
+        self.log = deque(maxlen=log_size)
+        self.seq = 0
+        self.summary = {}
+        self.state = {}
+        self.slot_ids = []
+        self.slot_boxes = np.empty((0, 4), dtype=np.float32)
+        self._snapshot = None
+        self.tracker = VehicleTracker()
+        self.configure(slots or {})
+
+    def configure(self, slots, tracking=None):
+        """Set the slot layout as {slot_id: [x1, y1, x2, y2]} and reset state.
+
+        tracking optionally sets the tracker's min_hits, max_age and max_age_seconds.
+        Both are validated before anything changes; raises ValueError.
+        """
+        slot_ids, boxes = parse_slots(slots)
+        tracker_settings = parse_tracking(tracking)
+        with self.condition:
+            self.tracker.configure(dict(zip(slot_ids, boxes.tolist())), **tracker_settings)
+            self.slot_ids = slot_ids
+            self.slot_boxes = boxes
+            self.state = {slot_id: False for slot_id in self.slot_ids}
+            self.summary = {}
+            # Subscribers resync from a snapshot after a layout change
+            self.log.clear()
+            self.seq += 1
+            self._snapshot = None
+            self.condition.notify_all()
+
+    def summarize(self, result):
+        # Without a slot layout the lot size is only a random estimate, which
+        # would change every frame; publish just the vehicle count
+        if not self.slot_ids:
+            return {'car_count': result.car_count}
+        occupied = sum(self.state.values())
+        total = len(self.slot_ids)
+        return {
+            'car_count': result.car_count,
+            'empty_spaces': total - occupied,
+            'total_spaces': total,
+            'occupancy_rate': round(occupied / total * 100, 1),
+        }
+
+    def update(self, result, timestamp=None):
+        """Apply a DetectionResult; publishes a delta and returns it, or None if nothing changed.
+
+        timestamp is the frame's capture time (defaults to now) and drives dwell times.
+        """
+        with self.condition:
+            events = self.tracker.update(result.detections, timestamp)
+            changed = {}
+            if self.slot_ids:
+                occupied = slot_occupancy(self.slot_boxes, result.detections)
+                for slot_id, flag in zip(self.slot_ids, occupied.tolist()):
+                    if self.state[slot_id] != flag:
+                        self.state[slot_id] = flag
+                        changed[slot_id] = flag
+
+            summary = self.summarize(result)
+            if not changed and not events and summary == self.summary:
+                return None
+
+            self.summary = summary
+            self.seq += 1
+            delta = {'lot': self.lot_id, 'seq': self.seq, 'time': time.time(), 'slots': changed,
+                     'summary': summary}
+            if events:
+                delta['events'] = events
+            self.log.append((self.seq, encode_event('delta', self.seq, delta)))
+            self._snapshot = None
+            self.condition.notify_all()
+            return delta
+
+    def snapshot(self):
+        """Current full state as a dict"""
+        with self.condition:
+            return {'lot': self.lot_id, 'seq': self.seq, 'slots': dict(self.state),
+                    'summary': dict(self.summary), 'slot_stats': self.tracker.slot_stats()}
+
+    def snapshot_event(self):
+        """Snapshot SSE bytes, serialized at most once per state version"""
+        with self.condition:
+            if self._snapshot is None or self._snapshot[0] != self.seq:
+                self._snapshot = (self.seq, encode_event('snapshot', self.seq, self.snapshot()))
+            return self._snapshot
+
+    def events_after(self, seq):
+        """Logged events newer than seq, or None if seq is too old to resume from"""
+        if seq == self.seq:
+            return []
+        if seq > self.seq:
+            return None  # Unknown id, e.g. from before a server restart
+        if not self.log or self.log[0][0] > seq + 1:
+            return None
+        return [data for event_seq, data in self.log if event_seq > seq]
+
+    def stream(self, last_seq=None, keepalive=KEEPALIVE_SECONDS):
+        """Generator of SSE bytes for one subscriber.
+
+        Pass the client's Last-Event-ID as last_seq to resume without a snapshot.
+        """
+        if last_seq is None:
+            last_seq, data = self.snapshot_event()
+            yield data
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.seq != last_seq, timeout=keepalive)
+                pending = self.events_after(last_seq)
+                current = self.seq
+            if pending is None:
+                last_seq, data = self.snapshot_event()
+                yield data
+            elif pending:
+                last_seq = current
+                for data in pending:
+                    yield data
+            else:
+                yield b': keepalive\n\n'
+
+
+class FeedRegistry:
+    """Thread-safe map of lot id to LotFeed"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.feeds = {}
+
+    def get(self, lot_id, create=True):
+        with self.lock:
+            feed = self.feeds.get(lot_id)
+            if feed is None and create:
+                feed = self.feeds[lot_id] = LotFeed(lot_id)
+            return feed
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.feeds.values()))
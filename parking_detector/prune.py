@@ -0,0 +1,69 @@
+"""
+Export a detection model whose head only predicts the vehicle classes
+
+The classification convs of the YOLOv8 Detect head are sliced down to the
+VEHICLE_CLASSES rows, so the model scores 4 classes instead of 80 and NMS
+never sees anything else. Box regression is untouched.
+
+Usage:
+    python -m parking_detector.prune yolov8n.pt models/yolov8n_vehicles.pt
+    PARKING_MODEL=models/yolov8n_vehicles.pt gunicorn -c gunicorn.conf.py app_flask:app
+"""
+
+import argparse
+import sys
+from copy import deepcopy
+from datetime import datetime
+
+from .backends import VEHICLE_CLASSES
+
+
+def prune_to_vehicles(source, target):
+    """Write a copy of the model at source with a vehicle-only head to target"""
+    import torch
+    from ultralytics import YOLO, __version__
+
+    model = deepcopy(YOLO(source).model)
+    names = model.names
+    keep = [i for i, name in names.items() if name in VEHICLE_CLASSES]
+    if not keep:
+        raise ValueError(f"{source} has none of the classes {VEHICLE_CLASSES}")
+
+    head = model.model[-1]  # Detect module
+    index = torch.tensor(keep)
+    for branch in head.cv3:
+        conv = branch[-1]  # Final 1x1 conv: one output channel per class
+        pruned = torch.nn.Conv2d(conv.in_channels, len(keep), 1)
+        pruned.weight.data = conv.weight.data[index].clone()
+        pruned.bias.data = conv.bias.data[index].clone()
+        branch[-1] = pruned
+
+    head.nc = len(keep)
+    head.no = head.nc + head.reg_max * 4
+    model.names = {new: names[old] for new, old in enumerate(keep)}
+    model.nc = head.nc
+    if isinstance(getattr(model, 'yaml', None), dict):
+        model.yaml['nc'] = head.nc
+
+    torch.save({
+        'model': model.half(),
+        'ema': None,
+        'train_args': {'task': 'detect'},
+        'date': datetime.now().isoformat(),
+        'version': __version__,
+    }, target)
+    print(f"✅ Saved {len(keep)}-class model to {target}: {list(model.names.values())}")
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a vehicle-only detection model")
+    parser.add_argument('source', help='Model to prune, e.g. yolov8n.pt')
+    parser.add_argument('target', help='Where to write the pruned model')
+    args = parser.parse_args()
+    prune_to_vehicles(args.source, args.target)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Lightweight multi-object tracking for dwell time and turnover
+
+IoU tracker with ByteTrack-style two-stage association: confident
+detections are matched to tracks first, then leftover tracks get a second
+chance against low-confidence detections (partly occluded cars). Matching
+is greedy on a NumPy IoU cost matrix, so a frame costs a few vectorized
+operations plus a loop over the matches.
+
+Confirmation counts frames, so a track counts once it has been matched in
+min_hits frames whatever the frame rate. A track is dropped only after
+max_age consecutive frames without a match *and* max_age_seconds since it
+was last seen: the frame limit keeps a camera posting every few seconds
+from dropping parked cars, the time limit keeps a 30 fps stream from
+dropping them when someone walks past. Arrivals are stamped with the time
+the vehicle entered the slot, not the later frame that confirmed it.
+Tracks are kept as arrays (one row per track) and capped at max_tracks,
+so memory stays bounded per camera. TRACK_MIN_HITS, TRACK_MAX_AGE and
+TRACK_MAX_AGE_SECONDS change the defaults.
+
+    tracker = VehicleTracker(slots={'A1': [x1, y1, x2, y2]})
+    events = tracker.update(result.detections, timestamp)
+    # [{'type': 'arrival', 'slot': 'A1', 'track_id': 7, 'time': ...}, ...]
+"""
+
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+
+from .backends import VEHICLE_CLASSES
+
+HIGH_SCORE = 0.5
+LOW_SCORE = 0.1
+MATCH_IOU = 0.3
+MIN_HITS = int(os.environ.get('TRACK_MIN_HITS', 2))  # Frames matched before a track counts
+MAX_AGE = int(os.environ.get('TRACK_MAX_AGE', 5))  # Missed frames before a track is dropped
+MAX_AGE_SECONDS = float(os.environ.get('TRACK_MAX_AGE_SECONDS', 3.0))  # ...and seconds unseen
+MAX_TRACKS = 512
+SLOT_OVERLAP = 0.3
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of boxes a (N, 4) and b (M, 4) in xyxy format"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.clip(union, 1e-6, None)
+
+
+def greedy_match(iou, threshold):
+    """Match rows to columns by descending IoU; returns (rows, cols) arrays"""
+    if not iou.size:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    matched_rows, matched_cols = [], []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matched_rows.append(r)
+        matched_cols.append(c)
+    return np.asarray(matched_rows, dtype=int), np.asarray(matched_cols, dtype=int)
+
+
+def assign_slots(boxes, slot_boxes, overlap=SLOT_OVERLAP):
+    """Index of the slot each box covers most (-1 if it covers none enough)"""
+    if not len(boxes) or not len(slot_boxes):
+        return np.full(len(boxes), -1, dtype=int)
+    x1 = np.maximum(boxes[:, None, 0], slot_boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], slot_boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], slot_boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], slot_boxes[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    slot_area = (slot_boxes[:, 2] - slot_boxes[:, 0]) * (slot_boxes[:, 3] - slot_boxes[:, 1])
+    coverage = intersection / np.clip(slot_area, 1e-6, None)[None, :]
+    best = coverage.argmax(axis=1)
+    return np.where(coverage[np.arange(len(boxes)), best] >= overlap, best, -1)
+
+
+class VehicleTracker:
+    """Tracks vehicles across frames from one camera and emits slot events"""
+
+    def __init__(self, slots=None, high_score=HIGH_SCORE, low_score=LOW_SCORE,
+                 match_iou=MATCH_IOU, min_hits=MIN_HITS, max_age=MAX_AGE,
+                 max_age_seconds=MAX_AGE_SECONDS, max_tracks=MAX_TRACKS):
+        self.high_score = high_score
+        self.low_score = low_score
+        self.match_iou = match_iou
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.max_age_seconds = max_age_seconds
+        self.max_tracks = max_tracks
+        self.lock = threading.Lock()
+        self.next_id = itertools.count(1)
+        self.slot_ids = []
+        self.slot_boxes = np.empty((0, 4), dtype=np.float32)
+        self.stats = {}
+        self.reset_tracks()
+        self.configure(slots or {})
+
+    def reset_tracks(self):
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hits = np.empty(0, dtype=np.int32)
+        self.missed = np.empty(0, dtype=np.int32)  # Consecutive frames without a match
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.slot = np.empty(0, dtype=int)  # Current slot index, -1 for none
+        self.slot_since = np.empty(0, dtype=np.float64)
+        # Slot the track's box last covered (confirmed or not) and since when
+        self.zone = np.empty(0, dtype=int)
+        self.zone_since = np.empty(0, dtype=np.float64)
+
+    def configure(self, slots, min_hits=None, max_age=None, max_age_seconds=None):
+        """Set the slot layout as {slot_id: [x1, y1, x2, y2]}; clears slot history.
+
+        min_hits, max_age (in frames) and max_age_seconds are changed only when given.
+        """
+        with self.lock:
+            if min_hits is not None:
+                self.min_hits = min_hits
+            if max_age is not None:
+                self.max_age = max_age
+            if max_age_seconds is not None:
+                self.max_age_seconds = max_age_seconds
+            self.slot_ids = list(slots)
+            self.slot_boxes = np.asarray(
+                [slots[slot_id] for slot_id in self.slot_ids], dtype=np.float32
+            ).reshape(-1, 4)
+            self.slot[:] = -1
+            self.zone[:] = -1
+            self.stats = {
+                slot_id: {'arrivals': 0, 'departures': 0, 'total_dwell': 0.0,
+                          'track_id': None, 'since': None}
+                for slot_id in self.slot_ids
+            }
+
+    def update(self, detections, timestamp=None):
+        """Advance one frame; returns the slot events it caused"""
+        now = time.time() if timestamp is None else float(timestamp)
+        vehicles = [d for d in detections if d['label'] in VEHICLE_CLASSES]
+        boxes = np.asarray([d['bbox'] for d in vehicles], dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray([d['confidence'] for d in vehicles], dtype=np.float32)
+
+        with self.lock:
+            events = []
+            self.missed += 1
+            high = np.flatnonzero(scores >= self.high_score)
+            low = np.flatnonzero((scores >= self.low_score) & (scores < self.high_score))
+
+            # Stage 1: all tracks against confident detections
+            track_rows, det_cols = greedy_match(iou_matrix(self.boxes, boxes[high]), self.match_iou)
+            matched_tracks = track_rows
+            matched_dets = high[det_cols]
+
+            # Stage 2: leftover tracks against low-confidence detections
+            leftover = np.setdiff1d(np.arange(len(self.ids)), track_rows)
+            rows, cols = greedy_match(iou_matrix(self.boxes[leftover], boxes[low]), self.match_iou)
+            matched_tracks = np.concatenate([matched_tracks, leftover[rows]])
+            matched_dets = np.concatenate([matched_dets, low[cols]])
+
+            self.boxes[matched_tracks] = boxes[matched_dets]
+            self.hits[matched_tracks] += 1
+            self.missed[matched_tracks] = 0
+            self.last_seen[matched_tracks] = now
+
+            # Unmatched confident detections start new tentative tracks
+            new = np.setdiff1d(high, matched_dets)
+            if len(new):
+                events.extend(self.add_tracks(boxes[new], now))
+
+            events.extend(self.expire(now))
+            events.extend(self.update_slots(now))
+            return events
+
+    def add_tracks(self, boxes, now):
+        count = len(boxes)
+        self.boxes = np.concatenate([self.boxes, boxes])
+        self.ids = np.concatenate([self.ids, [next(self.next_id) for _ in range(count)]])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int32)])
+        self.missed = np.concatenate([self.missed, np.zeros(count, dtype=np.int32)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(count, now)])
+        self.slot = np.concatenate([self.slot, np.full(count, -1, dtype=int)])
+        self.slot_since = np.concatenate([self.slot_since, np.full(count, now)])
+        self.zone = np.concatenate([self.zone, np.full(count, -1, dtype=int)])
+        self.zone_since = np.concatenate([self.zone_since, np.full(count, now)])
+        if len(self.ids) <= self.max_tracks:
+            return []
+        # Over the cap: keep the most recently seen tracks
+        keep = np.argsort(-self.last_seen, kind='stable')[:self.max_tracks]
+        return self.remove_tracks(np.setdiff1d(np.arange(len(self.ids)), keep))
+
+    def remove_tracks(self, rows):
+        """Drop tracks, emitting departures for any that held a slot"""
+        events = []
+        for row in rows.tolist():
+            if self.slot[row] >= 0:
+                events.append(self.depart(row, self.last_seen[row]))
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[rows] = False
+        self.boxes = self.boxes[keep]
+        self.ids = self.ids[keep]
+        self.hits = self.hits[keep]
+        self.missed = self.missed[keep]
+        self.last_seen = self.last_seen[keep]
+        self.slot = self.slot[keep]
+        self.slot_since = self.slot_since[keep]
+        self.zone = self.zone[keep]
+        self.zone_since = self.zone_since[keep]
+        return events
+
+    def expire(self, now):
+        """Drop tracks unmatched for more than max_age frames and max_age_seconds"""
+        stale = np.flatnonzero((self.missed > self.max_age)
+                               & (now - self.last_seen > self.max_age_seconds))
+        return self.remove_tracks(stale) if len(stale) else []
+
+    def update_slots(self, now):
+        """Move confirmed tracks seen this frame between slots"""
+        events = []
+        seen = np.flatnonzero(self.missed == 0)
+        if not len(seen):
+            return events
+        # Remember when each track's box entered its current slot, even while
+        # the track is still tentative, so arrivals are not stamped late
+        assigned = assign_slots(self.boxes[seen], self.slot_boxes)
+        entered = seen[assigned != self.zone[seen]]
+        self.zone[seen] = assigned
+        self.zone_since[entered] = now
+
+        rows = seen[self.hits[seen] >= self.min_hits]
+        for row in rows.tolist():
+            slot = self.zone[row]
+            if slot == self.slot[row]:
+                continue
+            if self.slot[row] >= 0:
+                events.append(self.depart(row, now))
+            if slot >= 0:
+                events.append(self.arrive(row, slot, self.zone_since[row]))
+        return events
+
+    def arrive(self, row, slot, since):
+        since = float(since)
+        self.slot[row] = slot
+        self.slot_since[row] = since
+        slot_id = self.slot_ids[slot]
+        stats = self.stats[slot_id]
+        stats['arrivals'] += 1
+        stats['track_id'] = int(self.ids[row])
+        stats['since'] = since
+        return {'type': 'arrival', 'slot': slot_id, 'track_id': int(self.ids[row]), 'time': since}
+
+    def depart(self, row, now):
+        slot_id = self.slot_ids[self.slot[row]]
+        dwell = float(now - self.slot_since[row])
+        stats = self.stats[slot_id]
+        stats['departures'] += 1
+        stats['total_dwell'] += dwell
+        if stats['track_id'] == int(self.ids[row]):
+            stats['track_id'] = None
+            stats['since'] = None
+        self.slot[row] = -1
+        return {'type': 'departure', 'slot': slot_id, 'track_id': int(self.ids[row]),
+                'time': float(now), 'dwell': dwell}
+
+    def tracks(self):
+        """Confirmed tracks as dicts"""
+        with self.lock:
+            rows = np.flatnonzero(self.hits >= self.min_hits)
+            return [{
+                'track_id': int(self.ids[row]),
+                'bbox': self.boxes[row].tolist(),
+                'slot': self.slot_ids[self.slot[row]] if self.slot[row] >= 0 else None,
+                'last_seen': float(self.last_seen[row]),
+            } for row in rows.tolist()]
+
+    def slot_stats(self):
+        """Per-slot arrivals, departures, mean dwell (seconds) and current occupant"""
+        with self.lock:
+            return {
+                slot_id: {
+                    'arrivals': stats['arrivals'],
+                    'departures': stats['departures'],
+                    'mean_dwell': (stats['total_dwell'] / stats['departures']
+                                   if stats['departures'] else None),
+                    'track_id': stats['track_id'],
+                    'since': stats['since'],
+                }
+                for slot_id, stats in self.stats.items()
+            }
@@ -0,0 +1,172 @@
+"""
+Local model-artifact cache with integrity hashes
+
+Weights are fetched once (at image build time) into a cache directory and
+recorded in manifest.json with their sha256, so the service can start with
+no network access. Every load re-checks the hash: cached files through
+resolve(), and local models such as models/parking_model.pt through
+verify() once they have been added to the manifest.
+
+Usage:
+    python -m parking_detector.weights prefetch [yolov8n.pt ...] [--warm]
+    python -m parking_detector.weights add models/parking_model.pt
+    python -m parking_detector.weights verify
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+CACHE_DIR = os.environ.get('PARKING_MODEL_CACHE', os.path.join('models', 'cache'))
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_WEIGHTS = ['yolov8n.pt']
+
+_manifest_lock = threading.Lock()
+
+
+class IntegrityError(Exception):
+    """A weights file does not match the hash recorded in the manifest"""
+
+
+def is_offline():
+    """True when weights must never be downloaded (PARKING_OFFLINE=1)"""
+    return os.environ.get('PARKING_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+
+def sha256sum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(cache_dir=CACHE_DIR):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(manifest, cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def record(name, path, cache_dir=CACHE_DIR):
+    """Hash a file already in the cache and add it to the manifest"""
+    entry = {'sha256': sha256sum(path), 'size': os.path.getsize(path)}
+    with _manifest_lock:
+        manifest = read_manifest(cache_dir)
+        manifest[name] = entry
+        write_manifest(manifest, cache_dir)
+    return entry
+
+
+def resolve(name, cache_dir=CACHE_DIR):
+    """Path of a verified cached artifact, or None if missing or corrupt"""
+    entry = read_manifest(cache_dir).get(name)
+    path = os.path.join(cache_dir, name)
+    if entry is None or not os.path.exists(path):
+        return None
+    if os.path.getsize(path) != entry['size'] or sha256sum(path) != entry['sha256']:
+        print(f"❌ Cached weights {path} failed the integrity check")
+        return None
+    return path
+
+
+def verify(path, name=None, cache_dir=CACHE_DIR):
+    """Check a weights file against its manifest entry (looked up by file name).
+
+    Returns False if the manifest has no entry for it, True if it matches,
+    and raises IntegrityError if it does not.
+    """
+    entry = read_manifest(cache_dir).get(name or os.path.basename(path))
+    if entry is None:
+        return False
+    if os.path.getsize(path) != entry['size'] or sha256sum(path) != entry['sha256']:
+        raise IntegrityError(f"{path} does not match the sha256 recorded in the model cache manifest")
+    return True
+
+
+def add(path, name=None, cache_dir=CACHE_DIR):
+    """Copy a local weights file (e.g. a custom model) into the cache"""
+    name = name or os.path.basename(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, name)
+    if os.path.abspath(path) != os.path.abspath(target):
+        shutil.copyfile(path, target)
+    record(name, target, cache_dir)
+    return target
+
+
+def fetch(name, cache_dir=CACHE_DIR):
+    """Return a verified cached path, downloading the weights first if allowed"""
+    path = resolve(name, cache_dir)
+    if path is not None:
+        return path
+    if is_offline():
+        raise FileNotFoundError(
+            f"{name} is not in the model cache {cache_dir} and PARKING_OFFLINE is set"
+        )
+
+    from ultralytics.utils.downloads import attempt_download_asset
+
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, name)
+    if os.path.exists(target):
+        os.remove(target)  # Corrupt or unrecorded copy
+    print(f"⬇️  Downloading {name} into {cache_dir}...")
+    attempt_download_asset(target)
+    if not os.path.exists(target):
+        raise FileNotFoundError(f"Download of {name} failed")
+    entry = record(name, target, cache_dir)
+    print(f"✅ Cached {name} ({entry['size'] / (1024 * 1024):.1f} MB, sha256 {entry['sha256'][:12]}...)")
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model-artifact cache")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    prefetch_parser = commands.add_parser('prefetch', help='Download weights into the cache')
+    prefetch_parser.add_argument('names', nargs='*', default=DEFAULT_WEIGHTS)
+    prefetch_parser.add_argument('--warm', action='store_true',
+                                 help='Also load the model and run a warm-up inference')
+    add_parser = commands.add_parser('add', help='Add a local weights file to the cache')
+    add_parser.add_argument('path')
+    add_parser.add_argument('--name')
+    commands.add_parser('verify', help='Check every cached file against its hash')
+    args = parser.parse_args()
+
+    if args.command == 'prefetch':
+        for name in args.names:
+            fetch(name, args.cache_dir)
+        if args.warm:
+            from .engine import get_engine
+            if not get_engine().warm_up():
+                return 1
+    elif args.command == 'add':
+        path = add(args.path, args.name, args.cache_dir)
+        print(f"✅ Added {path}")
+    else:
+        ok = True
+        for name in read_manifest(args.cache_dir):
+            if resolve(name, args.cache_dir) is None:
+                ok = False
+            else:
+                print(f"✅ {name}")
+        return 0 if ok else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import numpy as np
+
+from parking_detector.backends import Backend
+from parking_detector.engine import DetectionEngine, DetectionOptions
+
+
+class CountingBackend(Backend):
+    """Returns one car per image and records every model call"""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, images, options):
+        self.calls.append(len(images))
+        car = {'bbox': [0, 0, 10, 10], 'confidence': 0.9, 'class': 2, 'label': 'car'}
+        return [([car], lambda: np.zeros((4, 4, 3), dtype=np.uint8)) for _ in images]
+
+
+class BrokenBackend(Backend):
+    name = 'broken'
+
+    def load(self):
+        self.load_error = 'no weights'
+        return None
+
+
+def frame(value):
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+def test_images_are_inferred_in_batches():
+    backend = CountingBackend()
+    engine = DetectionEngine(backend, cache_size=0)
+    results = engine.detect([frame(i) for i in range(5)], DetectionOptions(batch_size=2))
+    assert backend.calls == [2, 2, 1]
+    assert [r.car_count for r in results] == [1] * 5
+    assert all(r.annotated_image is not None for r in results)
+
+
+def test_cache_is_keyed_by_image_and_options():
+    backend = CountingBackend()
+    engine = DetectionEngine(backend, cache_size=8)
+    options = DetectionOptions(annotate=False)
+    first = engine.detect([frame(1)], options)[0]
+    assert engine.detect([frame(1)], options)[0] is first
+    engine.detect([frame(1)], DetectionOptions(annotate=False, conf=0.5))
+    engine.detect([frame(2)], options)
+    assert backend.calls == [1, 1, 1]
+
+
+def test_annotated_results_are_not_cached():
+    backend = CountingBackend()
+    engine = DetectionEngine(backend, cache_size=8)
+    engine.detect([frame(1)])
+    engine.detect([frame(1)])
+    assert backend.calls == [1, 1]
+    assert not engine.cache.entries
+
+
+def test_cache_evicts_least_recently_used():
+    backend = CountingBackend()
+    engine = DetectionEngine(backend, cache_size=2)
+    options = DetectionOptions(annotate=False)
+    for value in (1, 2, 1, 3, 1):
+        engine.detect([frame(value)], options)
+    # 2 was evicted by 3; 1 stayed because it was used again
+    assert backend.calls == [1, 1, 1]
+    engine.detect([frame(2)], options)
+    assert backend.calls == [1, 1, 1, 1]
+
+
+def test_hooks_receive_events():
+    engine = DetectionEngine(CountingBackend(), cache_size=8)
+    events = []
+    hook = engine.add_hook(lambda event, info: events.append((event, info)))
+    options = DetectionOptions(annotate=False)
+    engine.detect([frame(1), frame(2)], options)
+    engine.detect([frame(1)], options)
+    assert [event for event, _ in events] == ['inference', 'detect', 'cache_hit', 'detect']
+    assert events[0][1]['batch_size'] == 2 and events[0][1]['backend'] == 'counting'
+    assert events[3][1]['inferred'] == 0
+    engine.remove_hook(hook)
+    engine.detect([frame(3)], options)
+    assert len(events) == 4
+
+
+def test_failing_hook_does_not_break_detection():
+    engine = DetectionEngine(CountingBackend(), cache_size=0)
+    engine.add_hook(lambda event, info: 1 / 0)
+    assert engine.detect([frame(1)])[0].car_count == 1
+
+
+def test_warm_up_sets_ready():
+    engine = DetectionEngine(CountingBackend(), cache_size=0)
+    assert engine.load_error is None
+    assert engine.warm_up() is True and engine.ready
+
+
+def test_failed_load_falls_back_and_stays_unready():
+    engine = DetectionEngine(BrokenBackend(), cache_size=0)
+    assert engine.warm_up() is False
+    assert engine.load_error == 'no weights'
+    assert engine.detect([frame(1)])[0].is_simulation
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+
+from parking_detector.engine import DetectionResult
+from parking_detector.feed import FeedRegistry, LotFeed, parse_slots, parse_tracking, slot_occupancy
+
+SLOTS = {'A1': [0, 0, 10, 10], 'A2': [20, 0, 30, 10]}
+
+
+def car(bbox, confidence=0.9, label='car'):
+    return {'bbox': bbox, 'confidence': confidence, 'label': label, 'class': 2}
+
+
+def result(*detections):
+    count = sum(1 for d in detections if d['label'] == 'car')
+    return DetectionResult(list(detections), count, 0, count, 100.0)
+
+
+def parse(data):
+    """(event, seq, payload) of one SSE message"""
+    fields = dict(line.split(': ', 1) for line in data.decode().strip().split('\n'))
+    return fields['event'], int(fields['id']), json.loads(fields['data'])
+
+
+def test_slot_occupancy():
+    occupied = slot_occupancy(list(SLOTS.values()), [car([1, 1, 9, 9]), car([20, 0, 30, 10], label='person')])
+    assert occupied.tolist() == [True, False]
+    assert slot_occupancy([], [car([1, 1, 9, 9])]).tolist() == []
+
+
+@pytest.mark.parametrize('slots', [
+    None,
+    {'A1': [0, 0, 10]},
+    {'A1': ['a', 0, 10, 10]},
+    {'A1': [0, 0, float('nan'), 10]},
+    {'A1': [True, 0, 10, 10]},
+    {'A1': [10, 0, 0, 10]},
+])
+def test_parse_slots_rejects_bad_layouts(slots):
+    with pytest.raises(ValueError):
+        parse_slots(slots)
+
+
+def test_parse_tracking():
+    assert parse_tracking(None) == {}
+    assert parse_tracking({'max_age': 3}) == {'max_age': 3}
+    assert parse_tracking({'max_age_seconds': 0.5}) == {'max_age_seconds': 0.5}
+    for tracking in ({'max_age': 0}, {'min_hits': 1.5}, {'max_age_seconds': -1}, {'speed': 1}, [1]):
+        with pytest.raises(ValueError):
+            parse_tracking(tracking)
+
+
+def test_bad_layout_leaves_lot_unchanged():
+    feed = LotFeed('north', SLOTS)
+    seq = feed.seq
+    with pytest.raises(ValueError):
+        feed.configure({'B1': [0, 0, 10, 10], 'B2': ['a', 0, 1, 1]})
+    assert feed.slot_ids == ['A1', 'A2'] and feed.seq == seq
+
+
+def test_delta_carries_only_changed_slots():
+    feed = LotFeed('north', SLOTS)
+    delta = feed.update(result(car([1, 1, 9, 9])), 0)
+    assert delta['slots'] == {'A1': True}
+    assert delta['summary'] == {'car_count': 1, 'empty_spaces': 1, 'total_spaces': 2,
+                                'occupancy_rate': 50.0}
+    delta = feed.update(result(car([21, 1, 29, 9])), 1)
+    assert delta['slots'] == {'A1': False, 'A2': True}
+
+
+def test_unchanged_frames_publish_nothing():
+    feed = LotFeed('north', SLOTS)
+    feed.update(result(car([1, 1, 9, 9])), 0)
+    feed.update(result(car([1, 1, 9, 9])), 1)  # Tracker confirms the car: arrival event
+    seq = feed.seq
+    for t in range(2, 20):
+        assert feed.update(result(car([1, 1, 9, 9])), t) is None
+    assert feed.seq == seq and len(feed.log) == seq - 1
+
+
+def test_lot_without_slots_publishes_only_the_count():
+    feed = LotFeed('north')
+    assert feed.update(result(car([1, 1, 9, 9])), 0)['summary'] == {'car_count': 1}
+    assert feed.update(result(car([1, 1, 9, 9])), 1) is None
+
+
+def test_events_after():
+    feed = LotFeed('north', SLOTS)
+    start = feed.seq
+    assert feed.events_after(start) == []
+    # The log is empty right after a layout change, so older ids must resync
+    assert feed.events_after(start - 1) is None
+    feed.update(result(car([1, 1, 9, 9])), 0)
+    feed.update(result(), 1)
+    assert [parse(data)[1] for data in feed.events_after(start)] == [start + 1, start + 2]
+    assert [parse(data)[1] for data in feed.events_after(start + 1)] == [start + 2]
+    assert feed.events_after(feed.seq + 1) is None  # Id from before a restart
+
+
+def test_events_after_log_overflow():
+    feed = LotFeed('north', SLOTS, log_size=3)
+    start = feed.seq
+    for t in range(5):
+        feed.update(result(car([1, 1, 9, 9])) if t % 2 == 0 else result(), t)
+    assert feed.seq == start + 5
+    assert feed.events_after(start + 1) is None  # start + 2 was dropped from the log
+    assert [parse(data)[1] for data in feed.events_after(start + 2)] == [start + 3, start + 4, start + 5]
+
+
+def test_stream_starts_with_snapshot_then_deltas():
+    feed = LotFeed('north', SLOTS)
+    stream = feed.stream()
+    event, seq, payload = parse(next(stream))
+    assert event == 'snapshot' and seq == feed.seq
+    assert payload['slots'] == {'A1': False, 'A2': False}
+    feed.update(result(car([1, 1, 9, 9])), 0)
+    event, seq, payload = parse(next(stream))
+    assert event == 'delta' and seq == feed.seq and payload['slots'] == {'A1': True}
+
+
+def test_stream_resumes_from_last_event_id():
+    feed = LotFeed('north', SLOTS)
+    start = feed.seq
+    feed.update(result(car([1, 1, 9, 9])), 0)
+    feed.update(result(), 1)
+    stream = feed.stream(last_seq=start + 1)
+    event, seq, _ = parse(next(stream))
+    assert (event, seq) == ('delta', start + 2)
+
+
+def test_stream_resyncs_after_overflow():
+    feed = LotFeed('north', SLOTS, log_size=2)
+    start = feed.seq
+    for t in range(4):
+        feed.update(result(car([1, 1, 9, 9])) if t % 2 == 0 else result(), t)
+    event, seq, payload = parse(next(feed.stream(last_seq=start)))
+    assert (event, seq) == ('snapshot', feed.seq)
+    assert payload['slots'] == {'A1': False, 'A2': False}
+
+
+def test_stream_resyncs_after_layout_change():
+    feed = LotFeed('north', SLOTS)
+    stream = feed.stream()
+    next(stream)
+    feed.configure({'B1': [0, 0, 10, 10]})
+    event, seq, payload = parse(next(stream))
+    assert (event, seq) == ('snapshot', feed.seq)
+    assert payload['slots'] == {'B1': False}
+
+
+def test_stream_keepalive():
+    feed = LotFeed('north', SLOTS)
+    stream = feed.stream(keepalive=0.01)
+    next(stream)
+    assert next(stream) == b': keepalive\n\n'
+
+
+def test_snapshot_event_is_serialized_once_per_version():
+    feed = LotFeed('north', SLOTS)
+    first = feed.snapshot_event()
+    assert feed.snapshot_event() is first
+    feed.update(result(car([1, 1, 9, 9])), 0)
+    assert feed.snapshot_event() is not first
+
+
+def test_registry_only_creates_on_request():
+    feeds = FeedRegistry()
+    assert feeds.get('north', create=False) is None
+    feed = feeds.get('north')
+    assert feeds.get('north', create=False) is feed
+    assert list(feeds) == [feed]
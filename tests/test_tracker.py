@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from parking_detector.tracker import VehicleTracker, assign_slots, greedy_match, iou_matrix
+
+SLOTS = {'A1': [0, 0, 10, 10], 'A2': [20, 0, 30, 10]}
+
+
+def car(bbox, confidence=0.9, label='car'):
+    return {'bbox': bbox, 'confidence': confidence, 'label': label, 'class': 2}
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert np.allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]])
+    assert iou_matrix(a, b[:0]).shape == (1, 0)
+
+
+def test_greedy_match_prefers_highest_iou():
+    iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+    rows, cols = greedy_match(iou, 0.3)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0)]
+    rows, cols = greedy_match(np.array([[0.6, 0.8], [0.7, 0.1]]), 0.3)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 1), (1, 0)]
+
+
+def test_assign_slots():
+    boxes = np.array([[1, 1, 9, 9], [21, 1, 29, 9], [50, 50, 60, 60]], dtype=np.float32)
+    slots = np.array(list(SLOTS.values()), dtype=np.float32)
+    assert assign_slots(boxes, slots).tolist() == [0, 1, -1]
+
+
+def test_ids_are_stable_across_frames():
+    tracker = VehicleTracker(min_hits=1)
+    tracker.update([car([0, 0, 10, 10]), car([20, 0, 30, 10])], 0)
+    first = {t['track_id']: t['bbox'] for t in tracker.tracks()}
+    tracker.update([car([21, 0, 31, 10]), car([1, 0, 11, 10])], 1)
+    second = {t['track_id']: t['bbox'] for t in tracker.tracks()}
+    assert set(first) == set(second)
+    for track_id in first:
+        assert abs(first[track_id][0] - second[track_id][0]) == 1
+
+
+def test_low_confidence_detection_keeps_track_alive():
+    tracker = VehicleTracker(min_hits=1, max_age=0, max_age_seconds=0)
+    tracker.update([car([0, 0, 10, 10])], 0)
+    (track,) = tracker.tracks()
+    tracker.update([car([0, 0, 10, 10], confidence=0.2)], 1)
+    assert [t['track_id'] for t in tracker.tracks()] == [track['track_id']]
+    # Low-confidence detections never start tracks of their own
+    tracker.update([car([0, 0, 10, 10], confidence=0.2), car([50, 50, 60, 60], confidence=0.2)], 2)
+    assert len(tracker.ids) == 1
+
+
+def test_non_vehicles_are_ignored():
+    tracker = VehicleTracker(min_hits=1)
+    tracker.update([car([0, 0, 10, 10], label='person')], 0)
+    assert len(tracker.ids) == 0
+
+
+def test_tracks_expire_after_max_age_frames():
+    tracker = VehicleTracker(min_hits=1, max_age=2, max_age_seconds=0)
+    tracker.update([car([0, 0, 10, 10])], 0)
+    tracker.update([], 100)
+    tracker.update([], 200)
+    assert len(tracker.ids) == 1
+    tracker.update([], 300)
+    assert len(tracker.ids) == 0
+
+
+def test_short_occlusion_at_30_fps_keeps_the_track():
+    tracker = VehicleTracker(slots=SLOTS, max_age_seconds=2.0)
+    events = []
+    frame = 0
+    # Parked car for 1 s, hidden for 1 s (someone walking past), visible for 1 s
+    for visible in [True] * 30 + [False] * 30 + [True] * 30:
+        events += tracker.update([car([1, 1, 9, 9])] if visible else [], frame / 30)
+        frame += 1
+    assert [e['type'] for e in events] == ['arrival']
+    assert len(tracker.ids) == 1
+
+    # Gone for good: dropped once both the frame and the time limit have passed
+    for _ in range(90):
+        events += tracker.update([], frame / 30)
+        frame += 1
+    assert [e['type'] for e in events] == ['arrival', 'departure']
+    assert events[1]['track_id'] == events[0]['track_id']
+    assert events[1]['dwell'] == pytest.approx(89 / 30)
+
+
+def test_track_cap_keeps_most_recent():
+    tracker = VehicleTracker(min_hits=1, max_tracks=3)
+    for i in range(5):
+        tracker.update([car([i * 20, 0, i * 20 + 10, 10])], i)
+    assert len(tracker.ids) == 3
+    assert sorted(tracker.last_seen.tolist()) == [2, 3, 4]
+
+
+def test_slot_arrival_and_departure_with_sparse_frames():
+    tracker = VehicleTracker(slots=SLOTS)
+    events = []
+    # One parked car seen every 5 seconds, then gone
+    for t in range(0, 30, 5):
+        events += tracker.update([car([1, 1, 9, 9])], t)
+    for t in range(30, 30 + 5 * (tracker.max_age + 1), 5):
+        events += tracker.update([], t)
+
+    assert [e['type'] for e in events] == ['arrival', 'departure']
+    arrival, departure = events
+    assert arrival['slot'] == departure['slot'] == 'A1'
+    assert arrival['track_id'] == departure['track_id']
+    assert arrival['time'] == 0  # first seen, although only confirmed at t=5
+    assert departure['dwell'] == 25  # last seen at t=25
+    stats = tracker.slot_stats()['A1']
+    assert stats['arrivals'] == 1 and stats['departures'] == 1
+    assert stats['mean_dwell'] == 25 and stats['track_id'] is None
+
+
+def test_moving_between_slots():
+    tracker = VehicleTracker(slots=SLOTS, min_hits=1, match_iou=0.0)
+    events = tracker.update([car([1, 1, 9, 9])], 0)
+    events += tracker.update([car([21, 1, 29, 9])], 10)
+    assert [(e['type'], e['slot']) for e in events] == [
+        ('arrival', 'A1'), ('departure', 'A1'), ('arrival', 'A2')
+    ]
+
+
+def test_configure_sets_limits():
+    tracker = VehicleTracker()
+    tracker.configure(SLOTS, min_hits=4, max_age=10, max_age_seconds=1.5)
+    assert (tracker.min_hits, tracker.max_age, tracker.max_age_seconds) == (4, 10, 1.5)
+    assert list(tracker.slot_stats()) == ['A1', 'A2']
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from parking_detector import weights
+
+
+def cached_file(cache_dir, name='model.pt', data=b'weights'):
+    path = os.path.join(cache_dir, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    weights.record(name, path, cache_dir)
+    return path
+
+
+def overwrite(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_resolve_returns_verified_path(tmp_path):
+    path = cached_file(str(tmp_path))
+    assert weights.resolve('model.pt', str(tmp_path)) == path
+    assert weights.resolve('other.pt', str(tmp_path)) is None
+
+
+def test_resolve_rejects_size_mismatch(tmp_path):
+    path = cached_file(str(tmp_path))
+    overwrite(path, b'truncated')
+    assert weights.resolve('model.pt', str(tmp_path)) is None
+
+
+def test_resolve_rejects_hash_mismatch(tmp_path):
+    path = cached_file(str(tmp_path))
+    overwrite(path, b'WEIGHTS')  # Same size, different content
+    assert weights.resolve('model.pt', str(tmp_path)) is None
+
+
+def test_verify(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    model = tmp_path / 'parking_model.pt'
+    model.write_bytes(b'custom')
+    assert weights.verify(str(model), cache_dir=cache_dir) is False  # Not in the manifest
+
+    weights.add(str(model), cache_dir=cache_dir)
+    assert weights.verify(str(model), cache_dir=cache_dir) is True
+
+    model.write_bytes(b'tampered')
+    with pytest.raises(weights.IntegrityError):
+        weights.verify(str(model), cache_dir=cache_dir)
+
+
+def test_fetch_uses_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PARKING_OFFLINE', '1')
+    path = cached_file(str(tmp_path))
+    assert weights.fetch('model.pt', str(tmp_path)) == path
+
+
+def test_fetch_offline_never_downloads(tmp_path, monkeypatch):
+    monkeypatch.setenv('PARKING_OFFLINE', '1')
+    with pytest.raises(FileNotFoundError):
+        weights.fetch('yolov8n.pt', str(tmp_path))
+    # A corrupt cached copy is not replaced either
+    path = cached_file(str(tmp_path))
+    overwrite(path, b'corrupt')
+    with pytest.raises(FileNotFoundError):
+        weights.fetch('model.pt', str(tmp_path))
+    assert open(path, 'rb').read() == b'corrupt'